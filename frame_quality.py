@@ -0,0 +1,76 @@
+"""Cheap usability check run before any landmark / detector inference.
+
+Black, overexposed or heavily motion-blurred frames make FaceMesh and HOG
+report "no face", which used to count as a face violation. The checks here
+work on a small grayscale copy, so they cost a fraction of one FaceMesh pass.
+
+Calibration: the thresholds were picked on 640x480 head-and-shoulders frames
+(plain wall, sensor noise sigma 3, see tests/test_frame_quality.py), measured
+on the GATE_WIDTH copy:
+
+    frame                       brightness  contrast  sharpness
+    sharp                          138         29.5      0.33
+    Gaussian blur sigma 2 / 4      138         29 / 28   0.11 / 0.025
+    Gaussian blur sigma 6          138         27.8      0.008
+    31 / 121 px motion blur        138         28.6 / 26 0.086 / 0.050
+    dim room (x0.25)                34          7.4      0.34
+    backlit (x0.6 + 90)            173         17.8      0.34
+    lens covered by a hand          11          0.5       -
+
+They are deliberately loose: only frames nothing can be read from are
+rejected, and dim or backlit frames still go to FaceMesh. Sharpness is the
+Laplacian variance divided by the intensity variance, so it does not fall
+just because a frame is dark or low in contrast.
+"""
+from collections import namedtuple
+
+import cv2
+
+# Width of the downscaled copy the metrics are computed on
+GATE_WIDTH = 160
+
+MIN_BRIGHTNESS = 25
+MAX_BRIGHTNESS = 235
+MIN_CONTRAST = 4
+# Normalized Laplacian variance; below this the frame is heavily blurred
+MIN_SHARPNESS = 0.015
+
+FrameQuality = namedtuple("FrameQuality", "ok reason covered brightness contrast sharpness")
+
+REASON_TEXT = {
+    "too_dark": "Frame too dark",
+    "overexposed": "Frame overexposed",
+    "low_contrast": "Frame has no contrast",
+    "blurry": "Frame too blurry",
+}
+
+
+def assess_frame(frame_bgr):
+    h, w = frame_bgr.shape[:2]
+    if w > GATE_WIDTH:
+        small = cv2.resize(frame_bgr, (GATE_WIDTH, max(1, h * GATE_WIDTH // w)),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = frame_bgr
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    mean, std = cv2.meanStdDev(gray)
+    brightness = float(mean[0][0])
+    contrast = float(std[0][0])
+    sharpness = 0.0
+    if contrast > 0:
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_16S).var()) / (contrast * contrast)
+
+    if brightness < MIN_BRIGHTNESS:
+        reason = "too_dark"
+    elif brightness > MAX_BRIGHTNESS:
+        reason = "overexposed"
+    elif contrast < MIN_CONTRAST:
+        reason = "low_contrast"
+    elif sharpness < MIN_SHARPNESS:
+        reason = "blurry"
+    else:
+        reason = None
+    # Nearly black and featureless: what a hand or tape over the lens looks like
+    covered = brightness < MIN_BRIGHTNESS and contrast < MIN_CONTRAST
+    return FrameQuality(reason is None, reason, covered, brightness, contrast, sharpness)
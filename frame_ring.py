@@ -0,0 +1,201 @@
+"""Shared-memory ring of preallocated frame slots.
+
+The capture process writes each webcam frame once into a slot; analysis
+processes (face_recognition, YOLO, FaceMesh in issue/headmovement.py) attach
+to the same block by name and read the slot in place, so nothing is pickled
+or copied between processes.
+
+    # capture process
+    ring = FrameRing.create(shape=(480, 640, 3))
+    while cap.isOpened():
+        slot = ring.begin_write()
+        ok, _ = cap.read(slot)          # decode straight into shared memory
+        if not ok:
+            break
+        ring.commit()
+
+    # analysis process (shape and dtype are read from the ring's header)
+    ring = FrameRing.attach(name)
+    reader = ring.reader(0)
+    while True:
+        seq, frame = reader.next()
+        if frame is None:
+            time.sleep(0.005); continue
+        ...                             # use frame in place
+        if not reader.still_valid(seq):
+            continue                    # writer lapped us, drop the result
+
+Each slot carries the sequence number of the frame it holds (-1 while being
+written), which lets readers detect that a slot was overwritten under them.
+Readers keep their cursor in shared memory so the capture side can see how
+far behind each consumer is. The writer never waits for readers; a slow
+reader skips ahead to the oldest frame still in the ring.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# header: write_seq, slots, max_readers, dtype char code, ndim, dims...,
+# followed by per-slot seqs and reader cursors
+_MAX_DIMS = 4
+_HEADER = 5 + _MAX_DIMS
+_WRITING = -1
+
+
+class FrameRing:
+    def __init__(self, shm, slots, shape, dtype, max_readers, owner):
+        self.shm = shm
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.max_readers = max_readers
+        self.owner = owner
+
+        meta_len = _HEADER + slots + max_readers
+        meta = np.ndarray((meta_len,), dtype=np.int64, buffer=shm.buf)
+        self._meta = meta
+        self._slot_seq = meta[_HEADER:_HEADER + slots]
+        self._cursors = meta[_HEADER + slots:]
+        self._frames = np.ndarray((slots,) + self.shape, dtype=self.dtype,
+                                  buffer=shm.buf, offset=meta.nbytes)
+        self._pending = None
+
+    @staticmethod
+    def _size(slots, shape, dtype, max_readers):
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return (_HEADER + slots + max_readers) * 8 + slots * frame_bytes
+
+    @classmethod
+    def create(cls, shape, slots=8, dtype=np.uint8, max_readers=4, name=None):
+        shape = tuple(int(d) for d in shape)
+        if not 1 <= len(shape) <= _MAX_DIMS:
+            raise ValueError(f"Frame shape must have 1 to {_MAX_DIMS} dimensions")
+        size = cls._size(slots, shape, dtype, max_readers)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        ring = cls(shm, slots, shape, dtype, max_readers, owner=True)
+        ring._meta[0] = 0
+        ring._meta[1] = slots
+        ring._meta[2] = max_readers
+        ring._meta[3] = ord(np.dtype(dtype).char)
+        ring._meta[4] = len(shape)
+        ring._meta[5:5 + len(shape)] = shape
+        ring._slot_seq[:] = _WRITING
+        ring._cursors[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, shape=None, dtype=None):
+        """Open an existing ring; shape/dtype, if given, must match what the creator used"""
+        shm = shared_memory.SharedMemory(name=name)
+        meta = np.ndarray((_HEADER,), dtype=np.int64, buffer=shm.buf)
+        slots, max_readers = int(meta[1]), int(meta[2])
+        ring_dtype = np.dtype(chr(int(meta[3])))
+        ring_shape = tuple(int(d) for d in meta[5:5 + int(meta[4])])
+        del meta
+        if ((shape is not None and tuple(shape) != ring_shape)
+                or (dtype is not None and np.dtype(dtype) != ring_dtype)):
+            shm.close()
+            raise ValueError(f"Ring '{name}' holds {ring_shape} {ring_dtype} frames, "
+                             f"not {shape} {dtype}")
+        return cls(shm, slots, ring_shape, ring_dtype, max_readers, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_seq(self):
+        """Sequence number the next committed frame will get"""
+        return int(self._meta[0])
+
+    # ---------- Writer ----------
+    def begin_write(self):
+        """Return the next slot as a writable array; call commit() once it is filled"""
+        seq = int(self._meta[0])
+        idx = seq % self.slots
+        self._slot_seq[idx] = _WRITING
+        self._pending = (seq, idx)
+        return self._frames[idx]
+
+    def commit(self):
+        seq, idx = self._pending
+        self._pending = None
+        self._slot_seq[idx] = seq
+        self._meta[0] = seq + 1
+        return seq
+
+    def write(self, frame):
+        """Copy a frame that was produced elsewhere into the ring (one copy)"""
+        np.copyto(self.begin_write(), frame, casting="no")
+        return self.commit()
+
+    # ---------- Readers ----------
+    def reader(self, index):
+        if not 0 <= index < self.max_readers:
+            raise ValueError(f"Reader index must be in [0, {self.max_readers})")
+        return FrameReader(self, index)
+
+    def lag(self, index):
+        """Frames committed but not yet consumed by reader index"""
+        return self.write_seq - int(self._cursors[index])
+
+    def close(self):
+        self._meta = self._slot_seq = self._cursors = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameReader:
+    def __init__(self, ring, index):
+        self.ring = ring
+        self.index = index
+        ring._cursors[index] = ring.write_seq
+
+    @property
+    def cursor(self):
+        return int(self.ring._cursors[self.index])
+
+    def _read(self, seq):
+        ring = self.ring
+        idx = seq % ring.slots
+        if ring._slot_seq[idx] != seq:
+            return None
+        return ring._frames[idx]
+
+    def next(self):
+        """Return (seq, frame view) for the next unread frame, or (None, None)"""
+        ring = self.ring
+        seq = self.cursor
+        while True:
+            head = ring.write_seq
+            if seq >= head:
+                ring._cursors[self.index] = seq
+                return None, None
+            if head - seq > ring.slots - 1:
+                # Lapped: the oldest slot may be mid-write, start one after it
+                seq = head - ring.slots + 1
+            frame = self._read(seq)
+            seq += 1
+            if frame is not None:
+                ring._cursors[self.index] = seq
+                return seq - 1, frame
+            # Overwritten between reading head and the slot; try the next one
+
+    def latest(self):
+        """Skip to the newest committed frame; returns (seq, frame view) or (None, None)"""
+        ring = self.ring
+        while True:
+            head = ring.write_seq
+            if head == 0 or self.cursor >= head:
+                return None, None
+            frame = self._read(head - 1)
+            ring._cursors[self.index] = head
+            if frame is not None:
+                return head - 1, frame
+            # Overwritten since head was read; a newer frame is committed
+
+    def still_valid(self, seq):
+        """True if the slot holding seq has not been overwritten since it was read"""
+        ring = self.ring
+        return int(ring._slot_seq[seq % ring.slots]) == seq
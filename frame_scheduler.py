@@ -0,0 +1,146 @@
+"""Admission control for proctor_server.py's frame analysis.
+
+FrameScheduler is a bounded queue holding at most one frame per session,
+served by a single worker thread (the shared FaceMesh instance is not
+thread-safe). A newer frame from the same session replaces the queued one
+in place, urgent sessions go through the priority lane, and a full queue is
+refused up front instead of letting every request wait longer.
+"""
+import threading
+import time
+from collections import deque
+
+
+class FrameJob:
+    def __init__(self, session, frame, now, quality, lane):
+        self.session = session
+        self.frame = frame
+        self.now = now
+        self.quality = quality
+        self.lane = lane
+        self.result = None
+        self.done = threading.Event()
+
+    def finish(self, result):
+        self.result = result
+        self.done.set()
+
+
+class FrameScheduler:
+    """Queue of FrameJobs; process(job) runs on the worker and returns the response dict.
+
+    Invariant: every job in pending sits in exactly one lane deque and
+    nothing else does, so each session has one place in line.
+    """
+
+    def __init__(self, capacity, process, priority_burst=3, min_retry=0.5,
+                 target_utilization=0.8, max_stretch=10.0, clock=time.monotonic, start=True):
+        self.capacity = capacity
+        self.process = process
+        # Priority frames served before a normal one is let through
+        self.priority_burst = priority_burst
+        self.min_retry = min_retry
+        self.pending = {}
+        self.lanes = {'priority': deque(), 'normal': deque()}
+        self.priority_streak = 0
+        self.service_time = 0.05
+        # Load feedback: clients multiply their frame interval by stretch
+        self.target_utilization = target_utilization
+        self.max_stretch = max_stretch
+        self.stretch = 1.0
+        self.clock = clock
+        self.window_start = clock()
+        self.window_arrivals = 0
+        self.cond = threading.Condition()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        if start:
+            self.worker.start()
+
+    def backlog_seconds(self):
+        """Rough time for the current backlog to drain"""
+        return len(self.pending) * self.service_time
+
+    def retry_after(self):
+        return max(self.min_retry, self.backlog_seconds())
+
+    def note_arrival(self):
+        """Count one incoming frame; once a second, re-fit stretch to the measured load"""
+        with self.cond:
+            now = self.clock()
+            elapsed = now - self.window_start
+            if elapsed >= 1.0:
+                utilization = self.window_arrivals / elapsed * self.service_time
+                # Multiplicative so it settles where utilization meets the target
+                stretch = self.stretch * utilization / self.target_utilization
+                self.stretch = min(self.max_stretch, max(1.0, stretch))
+                self.window_start = now
+                self.window_arrivals = 0
+            self.window_arrivals += 1
+
+    def has_room(self, session_id):
+        """Cheap check made before decoding, so refused requests cost almost nothing"""
+        return session_id in self.pending or len(self.pending) < self.capacity
+
+    def cancel(self, job):
+        """Withdraw a queued job; False if the worker has already taken it"""
+        with self.cond:
+            session_id = job.session.session_id
+            if self.pending.get(session_id) is not job:
+                return False
+            del self.pending[session_id]
+            self.lanes[job.lane].remove(job)
+            return True
+
+    def submit(self, session, frame, now, quality, urgent):
+        lane = 'priority' if urgent else 'normal'
+        with self.cond:
+            old = self.pending.get(session.session_id)
+            if old is None and len(self.pending) >= self.capacity:
+                return None
+            job = FrameJob(session, frame, now, quality, lane)
+            self.pending[session.session_id] = job
+            if old is not None:
+                old.finish({'success': False, 'superseded': True})
+                queued = self.lanes[old.lane]
+                if old.lane == lane:
+                    # Take over the place in line the stale frame had
+                    queued[queued.index(old)] = job
+                    return job
+                queued.remove(old)
+            self.lanes[lane].append(job)
+            self.cond.notify()
+            return job
+
+    def _next_job(self):
+        order = ('priority', 'normal')
+        if self.priority_streak >= self.priority_burst:
+            order = ('normal', 'priority')
+        for lane in order:
+            queued = self.lanes[lane]
+            while queued:
+                job = queued.popleft()
+                session_id = job.session.session_id
+                if self.pending.get(session_id) is not job:
+                    continue
+                del self.pending[session_id]
+                self.priority_streak = self.priority_streak + 1 if lane == 'priority' else 0
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    self.cond.wait()
+                    job = self._next_job()
+            self.run_job(job)
+
+    def run_job(self, job):
+        started = time.monotonic()
+        try:
+            result = self.process(job)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - started)
+        job.finish(result)
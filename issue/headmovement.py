@@ -9,6 +9,10 @@ from datetime import datetime
 import face_recognition
 from ultralytics import YOLO
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from proctor_policy import STANDALONE_POLICY, compile_policy, load_policy
+from frame_quality import assess_frame, REASON_TEXT
+
 # ---------- Beep (best-effort cross-platform) ----------
 try:
     import winsound
@@ -80,12 +84,23 @@ PHONE_LABELS = {"cell phone"}
 DETECT_EVERY_N_FRAMES = 3
 YOLO_CONF = 0.4
 
-YAW_THRESH = 10
-PITCH_UP = 10
-PITCH_DOWN = -10
-AFK_SECONDS = 5.0
 NOSE_VECTOR_SCALE = 5
 
+# ---------- Violation policy ----------
+# Thresholds, dwell times and exit limits live in proctor_policy.py;
+# pass a JSON file (argv[1] or PROCTOR_POLICY) to override them per exam.
+POLICY_PATH = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("PROCTOR_POLICY")
+policy = compile_policy(load_policy(POLICY_PATH, STANDALONE_POLICY) if POLICY_PATH
+                        else STANDALONE_POLICY)
+GAZE_KEYS = ("Looking Left", "Looking Right", "Looking Up")
+
+# Overlay denominators only; None when the policy sets no limit
+FACE_LIMIT = policy.limit_for("face")
+IRIS_LIMIT = policy.limit_for("iris")
+CAMERA_BLOCKED_LIMIT = policy.limit_for("camera_blocked")
+GAZE_LIMITS = {k: policy.limit_for(k) for k in GAZE_KEYS}
+GAZE_TOTAL_LIMIT = policy.limit_for(*GAZE_KEYS)
+
 # ---------- Models ----------
 yolo = YOLO("yolov8n.pt")
 
@@ -111,32 +126,33 @@ stable_single_face_frames = 0
 STABLE_N = 10
 
 # ---------- AFK & counters ----------
-current_gaze_state = "Forward"
-state_start_time = time.time()
-
-phone_episode = False
+policy_state = policy.new_state()
 frame_idx = 0
 last_fps = 0
 
-# Face proctoring (3 chances total)
-face_violation_count = 0
-face_violation_active = False
-
-# Head-pose gaze chances (unchanged)
-gaze_counts = {"Looking Left": 0, "Looking Right": 0, "Looking Up": 0}
-gaze_episode_active = {"Looking Left": False, "Looking Right": False, "Looking Up": False}
-
-def classify_direction(x_deg, y_deg):
-    if y_deg < -YAW_THRESH:
-        return "Looking Left"
-    elif y_deg > YAW_THRESH:
-        return "Looking Right"
-    elif x_deg > PITCH_UP:
-        return "Looking Up"
-    elif x_deg < PITCH_DOWN:
-        return "Looking Down"
-    else:
-        return "Forward"
+def with_limit(count, limit):
+    return str(count) if limit is None else f"{count}/{limit:g}"
+
+def current_gaze_state():
+    return policy_state.value("gaze", "Forward")
+
+def gaze_counts():
+    return {k: policy_state.count(k) for k in GAZE_KEYS}
+
+def build_summary(no_face, multi_human, unknown_present, phone_present, t0=None):
+    counts = gaze_counts()
+    return {
+        "face_violation_count": policy_state.count("face"),
+        "no_face": no_face, "multi_human": multi_human, "unknown_present": unknown_present,
+        "gaze_counts": counts, "gaze_total": sum(counts.values()),
+        "iris_total": policy_state.count("iris"),
+        "bad_frame_total": policy_state.count("bad_frame"),
+        "camera_blocked_total": policy_state.count("camera_blocked"),
+        "phone_present": phone_present,
+        "last_gaze_state": current_gaze_state(),
+        "elapsed_gaze_sec": policy_state.elapsed("gaze"),
+        "fps": last_fps if t0 is None else int(1.0 / max(1e-6, (time.time() - t0))),
+    }
 
 def draw_banner(image, text, color=(0,0,255)):
     h, w = image.shape[:2]
@@ -157,6 +173,10 @@ def get_face_encodings_safe(img_bgr):
         encs = []
     return locs, encs
 
+def exit_on_breach(frame, summary):
+    reason_key, msg, _ = policy_state.breach
+    exit_with_message(frame, msg, reason_key, summary)
+
 def exit_with_message(frame, msg, reason_key, summary):
     frame = draw_banner(frame, msg)
     cv2.imshow('Proctor', frame)
@@ -175,6 +195,25 @@ while cap.isOpened():
     t0 = time.time()
     H, W = frame.shape[:2]
 
+    # ----------------- Frame quality gate -----------------
+    # Skip HOG / YOLO / FaceMesh on frames they cannot read anything from,
+    # but a covered lens held for a while counts once enrolled
+    quality = assess_frame(frame)
+    frame_value = "covered" if quality.covered else ("good" if quality.ok else "bad")
+    if enrolled and policy_state.observe("frame", frame_value) and quality.covered:
+        beep()
+    if not quality.ok:
+        if policy_state.breach:
+            exit_on_breach(frame, build_summary(False, False, False, False))
+        cv2.putText(frame, f"Bad frame: {REASON_TEXT[quality.reason]}", (20, 45),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,165,255), 2)
+        cv2.putText(frame, f"Camera blocked: {with_limit(policy_state.count('camera_blocked'), CAMERA_BLOCKED_LIMIT)}",
+                    (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,0,255), 2)
+        cv2.imshow('Proctor', frame)
+        if cv2.waitKey(1) & 0xFF == 27:
+            break
+        continue
+
     # ----------------- Enrollment -----------------
     if not enrolled:
         locs, encs = get_face_encodings_safe(frame)
@@ -221,26 +260,11 @@ while cap.isOpened():
         cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
 
     face_violation_now = (no_face or multi_human or unknown_present)
-    if face_violation_now and not face_violation_active:
-        face_violation_count += 1
-        face_violation_active = True
+    if policy_state.observe("face", "violation" if face_violation_now else "ok"):
         beep()
-    if not face_violation_now and face_violation_active:
-        face_violation_active = False
-
-    if face_violation_count > 3:
-        summary = {
-            "face_violation_count": face_violation_count,
-            "no_face": no_face, "multi_human": multi_human, "unknown_present": unknown_present,
-            "gaze_counts": gaze_counts, "gaze_total": sum(gaze_counts.values()),
-            "iris_total": 0,  # filled later if iris tracked this loop
-            "phone_present": False,
-            "last_gaze_state": current_gaze_state,
-            "elapsed_gaze_sec": time.time() - state_start_time,
-            "fps": last_fps,
-        }
-        exit_with_message(frame, "AFK detected with face proctoring — test finished",
-                          "face_proctoring", summary)
+
+    if policy_state.breach:
+        exit_on_breach(frame, build_summary(no_face, multi_human, unknown_present, False))
 
     # 2) Device detection (phone)
     frame_idx += 1
@@ -258,20 +282,10 @@ while cap.isOpened():
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0,0,255), 2)
                 cv2.putText(frame, f"{cls_name} {conf:.2f}", (x1, max(20, y1-8)),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2)
+        policy_state.observe("phone", "present" if phone_present else "absent")
 
-    if phone_present:
-        summary = {
-            "face_violation_count": face_violation_count,
-            "no_face": no_face, "multi_human": multi_human, "unknown_present": unknown_present,
-            "gaze_counts": gaze_counts, "gaze_total": sum(gaze_counts.values()),
-            "iris_total": 0,
-            "phone_present": True,
-            "last_gaze_state": current_gaze_state,
-            "elapsed_gaze_sec": time.time() - state_start_time,
-            "fps": last_fps,
-        }
-        exit_with_message(frame, "AFK use of mobile — test finished",
-                          "device_mobile", summary)
+    if policy_state.breach:
+        exit_on_breach(frame, build_summary(no_face, multi_human, unknown_present, phone_present))
 
     # 3) Head pose (unchanged)
     pose_img = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
@@ -315,7 +329,7 @@ while cap.isOpened():
                     x = angles[0] * 360  # pitch
                     y = angles[1] * 360  # yaw
                     z = angles[2] * 360  # roll
-                    text = classify_direction(x, y)
+                    text = policy.classify_direction(x, y)
                     have_pose = True
                     p1 = (int(nose_2d[0]), int(nose_2d[1]))
                     p2 = (int(nose_2d[0] + y * NOSE_VECTOR_SCALE),
@@ -323,45 +337,17 @@ while cap.isOpened():
                     cv2.line(pose_img, p1, p2, (255, 0, 0), 3)
                     break
 
-    now = time.time()
-    disallowed_gaze = text in ("Looking Left", "Looking Right", "Looking Up")
-    if have_pose and text != current_gaze_state:
-        current_gaze_state = text
-        state_start_time = now
-        for k in gaze_episode_active:
-            if k != text:
-                gaze_episode_active[k] = False
-
-    elapsed = now - state_start_time
-    if disallowed_gaze and elapsed >= AFK_SECONDS:
-        if not gaze_episode_active[current_gaze_state]:
-            gaze_counts[current_gaze_state] += 1
-            gaze_episode_active[current_gaze_state] = True
-            beep()
+    # Without a pose the previous gaze state keeps dwelling
+    if policy_state.observe("gaze", text if have_pose else None):
+        beep()
 
-    total_gaze = sum(gaze_counts.values())
-    if (gaze_counts["Looking Left"] > 5 or
-        gaze_counts["Looking Right"] > 5 or
-        gaze_counts["Looking Up"] > 5 or
-        total_gaze > 8):
-        summary = {
-            "face_violation_count": face_violation_count,
-            "no_face": no_face, "multi_human": multi_human, "unknown_present": unknown_present,
-            "gaze_counts": gaze_counts, "gaze_total": total_gaze,
-            "iris_total": 0,
-            "phone_present": False,
-            "last_gaze_state": current_gaze_state,
-            "elapsed_gaze_sec": elapsed,
-            "fps": int(1.0 / max(1e-6, (time.time() - t0)))
-        }
-        exit_with_message(pose_img, "AFK detected with away looking — test finished",
-                          "gaze_away", summary)
+    if policy_state.breach:
+        exit_on_breach(pose_img, build_summary(no_face, multi_human, unknown_present, False, t0))
 
     # ----------------- IRIS TRACKING (fault = L/R/Up combined) -----------------
     # Balanced settings (unchanged from your last code)
     HEAD_GATE       = False
     EAR_BLINK_TH    = 0.17
-    DWELL_SECONDS_IRIS = 1.5
     H_ON   = 0.019
     H_OFF  = 0.024
     GAZE_V_UP_TH = 0.42
@@ -371,11 +357,6 @@ while cap.isOpened():
     if 'gH_s' not in globals(): gH_s = None
     if 'gV_s' not in globals(): gV_s = None
     if 'eye_state' not in globals(): eye_state = "Center"
-    if 'last_iris_state' not in globals(): last_iris_state = "OK"
-    if 'iris_state_start' not in globals(): iris_state_start = time.time()
-    if 'iris_episode_active' not in globals(): iris_episode_active = False
-    if 'iris_faults' not in globals(): iris_faults = 0
-    IRIS_TOTAL_LIMIT = 15  # allow up to 15
 
     def _pt(lms, idx, W, H):
         lm = lms[idx]; return np.array([lm.x * W, lm.y * H], dtype=np.float32)
@@ -437,16 +418,7 @@ while cap.isOpened():
             iris_flag = (eye_state in ("Left","Right","Up"))
 
             # dwell-based increment
-            now2 = time.time()
-            iris_state = "AFK_IRIS" if iris_flag else "OK"
-            if iris_state != last_iris_state:
-                last_iris_state = iris_state
-                iris_state_start = now2
-                iris_episode_active = False
-            iris_elapsed = now2 - iris_state_start
-            if iris_state == "AFK_IRIS" and iris_elapsed >= DWELL_SECONDS_IRIS and not iris_episode_active:
-                iris_faults += 1
-                iris_episode_active = True
+            if policy_state.observe("iris", "AFK_IRIS" if iris_flag else "OK"):
                 beep()
 
             # draw minimal viz w/o naming directions
@@ -460,27 +432,15 @@ while cap.isOpened():
                 cv2.arrowedLine(pose_img,p1,p2,(0,255,255),2,tipLength=0.35)
 
             # show only totals (no Left/Right/Up words)
-            cv2.putText(pose_img, f"Iris faults: {iris_faults}/15", (20, 235),
+            cv2.putText(pose_img, f"Iris faults: {with_limit(policy_state.count('iris'), IRIS_LIMIT)}", (20, 235),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,165,255), 2)
         else:
             cv2.putText(pose_img, "Iris: blink/closed — skipping", (20, 235),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
 
-    # Iris exit condition (exceeds 15)
-    if 'iris_faults' in globals():
-        if iris_faults/2 > 15:
-            summary = {
-                "face_violation_count": face_violation_count,
-                "no_face": no_face, "multi_human": multi_human, "unknown_present": unknown_present,
-                "gaze_counts": gaze_counts, "gaze_total": total_gaze,
-                "iris_total": iris_faults,
-                "phone_present": False,
-                "last_gaze_state": current_gaze_state,
-                "elapsed_gaze_sec": elapsed,
-                "fps": int(1.0 / max(1e-6, (time.time() - t0)))
-            }
-            exit_with_message(pose_img, "AFK detected (iris) — test finished",
-                              "iris_mismatch", summary)
+    # Iris exit condition
+    if policy_state.breach:
+        exit_on_breach(pose_img, build_summary(no_face, multi_human, unknown_present, False, t0))
 
     # ---------- Overlays ----------
     base_color = (0,255,0) if (text in ("Forward", "Looking Down")) else (0,165,255)
@@ -491,13 +451,16 @@ while cap.isOpened():
     cv2.putText(pose_img, f"x:{x:.1f}  y:{y:.1f}  z:{z:.1f}", (20, 90),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,0,255), 2)
 
-    cv2.putText(pose_img, f"Face violations: {face_violation_count}/3", (20, 130),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,0,255) if face_violation_count>=3 else (0,255,0), 2)
+    face_violation_count = policy_state.count("face")
+    face_at_limit = FACE_LIMIT is not None and face_violation_count >= FACE_LIMIT
+    cv2.putText(pose_img, f"Face violations: {with_limit(face_violation_count, FACE_LIMIT)}", (20, 130),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,0,255) if face_at_limit else (0,255,0), 2)
     cv2.putText(pose_img, f"Faces: {len(encs)}  KnownOK: {int(not (unknown_present or no_face))}", (20, 165),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0,255,0) if not (no_face or unknown_present or multi_human) else (0,0,255), 2)
 
-    total_gaze = sum(gaze_counts.values())
-    cv2.putText(pose_img, f"Left:{gaze_counts['Looking Left']}/5  Right:{gaze_counts['Looking Right']}/5  Up:{gaze_counts['Looking Up']}/5  Total:{total_gaze}/8",
+    counts = gaze_counts()
+    total_gaze = sum(counts.values())
+    cv2.putText(pose_img, f"Left:{with_limit(counts['Looking Left'], GAZE_LIMITS['Looking Left'])}  Right:{with_limit(counts['Looking Right'], GAZE_LIMITS['Looking Right'])}  Up:{with_limit(counts['Looking Up'], GAZE_LIMITS['Looking Up'])}  Total:{with_limit(total_gaze, GAZE_TOTAL_LIMIT)}",
                 (20, 200), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,165,255), 2)
 
     fps = 20.0 / max(1e-6, time.time() - t0)
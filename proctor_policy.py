@@ -0,0 +1,306 @@
+"""Declarative violation policy shared by proctor_server.py and issue/headmovement.py.
+
+A policy is a plain dict (or JSON file) describing head-pose thresholds,
+counting rules and exit limits. compile_policy() turns it into index tables
+once; each PolicyState then only touches the rules bound to the signal being
+observed and the limits bound to the counter being bumped, so the per-frame
+cost does not grow with the size of the policy.
+
+Rule fields:
+    counter   - name of the counter to increment
+    signal    - name of the observed signal (e.g. "face", "gaze", "iris")
+    when      - list of signal values that count as a violation
+    dwell     - seconds the value must be held before it counts (default 0)
+    count     - "episode" (once per continuous hold), "frame" (every
+                observation while held) or "seconds" (time held past the
+                dwell, so the count does not depend on the sampling rate)
+    max_step  - "seconds" only: most one observation can add (default 5),
+                so a long gap between frames is not all counted
+
+Limit fields:
+    reason    - key reported when the limit is exceeded
+    message   - human readable text for banners / API responses
+    counters  - counters summed by the limit
+    max       - the limit is breached once the sum is strictly greater
+"""
+import copy
+import json
+import time
+
+GAZE_AWAY = ["Looking Left", "Looking Right", "Looking Up"]
+
+# Signals proctor_server.py and issue/headmovement.py always feed. They are
+# registered even when an exam policy has no rule for them, so observing
+# them is a cheap no-op rather than an error.
+SIGNALS = ("face", "gaze", "frame", "phone", "iris")
+
+# Thresholds are enforced by the client (PythonProctor.jsx, e.g. face > 10).
+# Counting seconds held keeps them meaning what they did at the old fixed
+# one frame per second, whatever interval the server now recommends.
+SERVER_POLICY = {
+    "head_pose": {"yaw": 15, "pitch_up": 15, "pitch_down": -15},
+    "counters": ["face", "gaze", "multi_person", "unknown_person", "bad_frame", "camera_blocked"],
+    "rules": [
+        {"counter": "face", "signal": "face", "when": ["missing"], "count": "seconds"},
+        {"counter": "multi_person", "signal": "face", "when": ["multiple"], "count": "seconds"},
+        {"counter": "gaze", "signal": "gaze", "when": GAZE_AWAY, "dwell": 3, "count": "seconds"},
+        # Frames rejected by frame_quality.assess_frame never count as face
+        # time. bad_frame is informational; camera_blocked only counts the
+        # covered-lens signature (nearly black and featureless).
+        {"counter": "bad_frame", "signal": "frame", "when": ["bad", "covered"], "count": "seconds"},
+        {"counter": "camera_blocked", "signal": "frame", "when": ["covered"], "dwell": 3, "count": "seconds"},
+    ],
+    "limits": [],
+}
+
+# Matches the limits issue/headmovement.py used to hard-code.
+STANDALONE_POLICY = {
+    "head_pose": {"yaw": 10, "pitch_up": 10, "pitch_down": -10},
+    "counters": ["face", "phone", "Looking Left", "Looking Right", "Looking Up", "iris",
+                 "bad_frame", "camera_blocked"],
+    "rules": [
+        {"counter": "face", "signal": "face", "when": ["violation"], "count": "episode"},
+        {"counter": "phone", "signal": "phone", "when": ["present"], "count": "episode"},
+        {"counter": "Looking Left", "signal": "gaze", "when": ["Looking Left"], "dwell": 5.0, "count": "episode"},
+        {"counter": "Looking Right", "signal": "gaze", "when": ["Looking Right"], "dwell": 5.0, "count": "episode"},
+        {"counter": "Looking Up", "signal": "gaze", "when": ["Looking Up"], "dwell": 5.0, "count": "episode"},
+        {"counter": "iris", "signal": "iris", "when": ["AFK_IRIS"], "dwell": 1.5, "count": "episode"},
+        # Unusable stretches are only reported; a covered lens ends the exam
+        {"counter": "bad_frame", "signal": "frame", "when": ["bad", "covered"], "dwell": 10.0, "count": "episode"},
+        {"counter": "camera_blocked", "signal": "frame", "when": ["covered"], "dwell": 10.0, "count": "episode"},
+    ],
+    "limits": [
+        {"reason": "face_proctoring", "message": "AFK detected with face proctoring — test finished",
+         "counters": ["face"], "max": 3},
+        {"reason": "device_mobile", "message": "AFK use of mobile — test finished",
+         "counters": ["phone"], "max": 0},
+        {"reason": "gaze_away", "message": "AFK detected with away looking — test finished",
+         "counters": ["Looking Left"], "max": 5},
+        {"reason": "gaze_away", "message": "AFK detected with away looking — test finished",
+         "counters": ["Looking Right"], "max": 5},
+        {"reason": "gaze_away", "message": "AFK detected with away looking — test finished",
+         "counters": ["Looking Up"], "max": 5},
+        {"reason": "gaze_away", "message": "AFK detected with away looking — test finished",
+         "counters": GAZE_AWAY, "max": 8},
+        {"reason": "camera_blocked", "message": "AFK detected: camera covered — test finished",
+         "counters": ["camera_blocked"], "max": 2},
+        # The script used to exit on iris_faults / 2 > 15
+        {"reason": "iris_mismatch", "message": "AFK detected (iris) — test finished",
+         "counters": ["iris"], "max": 30},
+    ],
+}
+
+
+class PolicyError(ValueError):
+    pass
+
+
+def merge_policy(base, overrides=None):
+    """Return a copy of base with head_pose keys and rule/limit/counter lists overridden"""
+    merged = copy.deepcopy(base)
+    if not overrides:
+        return merged
+    if "head_pose" in overrides:
+        merged["head_pose"] = {**merged.get("head_pose", {}), **overrides["head_pose"]}
+    for key in ("counters", "rules", "limits"):
+        if key in overrides:
+            merged[key] = copy.deepcopy(overrides[key])
+    return merged
+
+
+def load_policy(path, base):
+    with open(path, "r", encoding="utf-8") as f:
+        return merge_policy(base, json.load(f))
+
+
+class CompiledPolicy:
+    def __init__(self, config):
+        head_pose = config.get("head_pose", {})
+        self.yaw_thresh = float(head_pose.get("yaw", 15))
+        self.pitch_up = float(head_pose.get("pitch_up", 15))
+        self.pitch_down = float(head_pose.get("pitch_down", -15))
+
+        self.counters = []
+        self.counter_index = {}
+        self.signals = []
+        self.signal_index = {}
+        self.rules_by_signal = []
+        for name in config.get("counters", []):
+            self._counter(name)
+        for name in SIGNALS:
+            self._signal(name)
+
+        # rule: (counter index, violating values, dwell seconds, count mode, max step)
+        self.rules = []
+        for rule in config.get("rules", []):
+            try:
+                counter = self._counter(rule["counter"])
+                signal = self._signal(rule["signal"])
+                when = rule["when"]
+            except KeyError as e:
+                raise PolicyError(f"Rule is missing field {e}: {rule}")
+            if isinstance(when, str) or not isinstance(when, (list, tuple)):
+                raise PolicyError(f"Rule 'when' must be a list of values: {rule}")
+            dwell = _number(rule.get("dwell", 0), "dwell", rule)
+            mode = rule.get("count", "episode")
+            if mode not in ("episode", "frame", "seconds"):
+                raise PolicyError(f"Unknown count mode '{mode}' in rule: {rule}")
+            max_step = _number(rule.get("max_step", 5), "max_step", rule)
+            self.rules_by_signal[signal].append(len(self.rules))
+            self.rules.append((counter, frozenset(when), dwell, mode, max_step))
+        self.watched_by_signal = [frozenset().union(*(self.rules[r][1] for r in rule_ids))
+                                  for rule_ids in self.rules_by_signal]
+
+        # limit: (reason, message, max)
+        self.limits = []
+        self.limit_counters = []
+        self.limits_by_counter = [[] for _ in self.counters]
+        for limit in config.get("limits", []):
+            try:
+                reason = limit["reason"]
+                names = limit["counters"]
+                maximum = limit["max"]
+            except KeyError as e:
+                raise PolicyError(f"Limit is missing field {e}: {limit}")
+            maximum = _number(maximum, "max", limit)
+            if isinstance(names, str) or not isinstance(names, (list, tuple)):
+                raise PolicyError(f"Limit 'counters' must be a list of names: {limit}")
+            for name in names:
+                if name not in self.counter_index:
+                    raise PolicyError(f"Limit references unknown counter '{name}'")
+                self.limits_by_counter[self.counter_index[name]].append(len(self.limits))
+            self.limits.append((reason, limit.get("message", reason), maximum))
+            self.limit_counters.append(frozenset(names))
+
+    def _counter(self, name):
+        if name not in self.counter_index:
+            self.counter_index[name] = len(self.counters)
+            self.counters.append(name)
+        return self.counter_index[name]
+
+    def _signal(self, name):
+        if name not in self.signal_index:
+            self.signal_index[name] = len(self.signals)
+            self.signals.append(name)
+            self.rules_by_signal.append([])
+        return self.signal_index[name]
+
+    def classify_direction(self, x_deg, y_deg):
+        if y_deg < -self.yaw_thresh:
+            return "Looking Left"
+        elif y_deg > self.yaw_thresh:
+            return "Looking Right"
+        elif x_deg > self.pitch_up:
+            return "Looking Up"
+        elif x_deg < self.pitch_down:
+            return "Looking Down"
+        else:
+            return "Forward"
+
+    def watched(self, signal):
+        """Values of signal that some rule counts as a violation"""
+        s = self.signal_index.get(signal)
+        return frozenset() if s is None else self.watched_by_signal[s]
+
+    def limit_for(self, *names):
+        """Return the smallest max among limits covering all of these counters (for overlays)"""
+        wanted = set(names)
+        if names[0] not in self.counter_index:
+            return None
+        maxima = [self.limits[i][2] for i in self.limits_by_counter[self.counter_index[names[0]]]
+                  if wanted <= self.limit_counters[i]]
+        return min(maxima) if maxima else None
+
+    def new_state(self, now=None):
+        return PolicyState(self, time.time() if now is None else now)
+
+
+def _number(value, field, entry):
+    if isinstance(value, bool):
+        raise PolicyError(f"'{field}' must be a number: {entry}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise PolicyError(f"'{field}' must be a number: {entry}")
+
+
+def compile_policy(config):
+    return CompiledPolicy(config)
+
+
+class PolicyState:
+    """Per-session counters and timers, preallocated from a CompiledPolicy"""
+
+    __slots__ = ("policy", "values", "since", "last_seen", "active", "counts", "totals", "breach")
+
+    def __init__(self, policy, now):
+        self.policy = policy
+        self.values = [None] * len(policy.signals)
+        self.since = [now] * len(policy.signals)
+        self.last_seen = [now] * len(policy.signals)
+        self.active = [False] * len(policy.rules)
+        self.counts = [0] * len(policy.counters)
+        self.totals = [0] * len(policy.limits)
+        # (reason, message, max) of the first limit exceeded, or None
+        self.breach = None
+
+    def observe(self, signal, value, now=None):
+        """Feed one observation; value None keeps the previous value. Returns True if a counter was bumped."""
+        policy = self.policy
+        s = policy.signal_index.get(signal)
+        if s is None:
+            return False
+        if now is None:
+            now = time.time()
+        rule_ids = policy.rules_by_signal[s]
+        prev_seen = self.last_seen[s]
+        self.last_seen[s] = now
+        if value is not None and value != self.values[s]:
+            self.values[s] = value
+            self.since[s] = now
+            for r in rule_ids:
+                self.active[r] = False
+        value = self.values[s]
+        elapsed = now - self.since[s]
+        bumped = False
+        for r in rule_ids:
+            counter, values, dwell, mode, max_step = policy.rules[r]
+            if value not in values or elapsed < dwell:
+                continue
+            if mode == "seconds":
+                step = min(now - max(prev_seen, self.since[s] + dwell), max_step)
+                if step > 0:
+                    self._bump(counter, step)
+                    bumped = True
+            elif mode == "frame" or not self.active[r]:
+                self.active[r] = True
+                self._bump(counter)
+                bumped = True
+        return bumped
+
+    def _bump(self, counter, amount=1):
+        policy = self.policy
+        self.counts[counter] += amount
+        for l in policy.limits_by_counter[counter]:
+            self.totals[l] += amount
+            if self.breach is None and self.totals[l] > policy.limits[l][2]:
+                self.breach = policy.limits[l]
+
+    def value(self, signal, default=None):
+        s = self.policy.signal_index.get(signal)
+        v = None if s is None else self.values[s]
+        return default if v is None else v
+
+    def elapsed(self, signal, now=None):
+        s = self.policy.signal_index.get(signal)
+        if s is None:
+            return 0.0
+        return (time.time() if now is None else now) - self.since[s]
+
+    def count(self, name):
+        c = self.policy.counter_index.get(name)
+        return 0 if c is None else self.counts[c]
+
+    def violations(self):
+        """Counter name -> whole count (seconds-based counters are rounded down)"""
+        return {name: int(c) for name, c in zip(self.policy.counters, self.counts)}
@@ -3,12 +3,16 @@ from flask_cors import CORS
 import cv2
 import mediapipe as mp
 import numpy as np
+import os
 import time
 import json
 import base64
 from datetime import datetime
 import threading
 import queue
+from proctor_policy import SERVER_POLICY, compile_policy, merge_policy, PolicyError
+from frame_quality import assess_frame, REASON_TEXT
+from frame_scheduler import FrameScheduler
 
 app = Flask(__name__)
 CORS(app)
@@ -22,46 +26,105 @@ face_mesh = mp_face_mesh.FaceMesh(
     min_tracking_confidence=0.5
 )
 
+# Cheap face counter for multi-person detection; FaceMesh above only tracks one face
+mp_face_detection = mp.solutions.face_detection
+face_detection = mp_face_detection.FaceDetection(
+    model_selection=0,  # short-range model, enough for a webcam
+    min_detection_confidence=0.5
+)
+FACE_COUNT_WIDTH = 320
+# Seconds between face counts while the tracked face is present
+FACE_COUNT_INTERVAL = 3.0
+
 # Proctoring state
 proctor_sessions = {}
 
+# Adaptive sampling: seconds the client should wait before its next frame
+FAST_INTERVAL = 0.5
+BASE_INTERVAL = 1.0
+SLOW_INTERVAL = 2.5
+STABLE_FORWARD_SECONDS = 20
+RECENT_VIOLATION_SECONDS = 10
+
+# Admission control: frames waiting for analysis (at most one per session)
+MAX_QUEUED_FRAMES = int(os.environ.get('PROCTOR_MAX_QUEUE', 32))
+# Priority frames served before a normal one is let through
+PRIORITY_BURST = 3
+# Longest a request waits for its frame to be analyzed
+ANALYZE_TIMEOUT = 5.0
+
+# Policy used when /api/proctor/start is called without a per-exam override
+default_policy = compile_policy(SERVER_POLICY)
+
 class ProctorSession:
-    def __init__(self, session_id):
+    def __init__(self, session_id, policy=None):
         self.session_id = session_id
         self.enrolled = False
         self.known_encoding = None
         self.stable_frames = 0
-        self.violations = {
-            'face': 0,
-            'gaze': 0,
-            'multi_person': 0,
-            'unknown_person': 0
-        }
+        self.policy = policy or default_policy
+        self.state = self.policy.new_state()
         self.current_gaze = 'Forward'
-        self.gaze_start_time = time.time()
-        
+        self.last_violation_time = 0.0
+        # Latched result of the last count_faces() run
+        self.face_count = 0
+        self.face_count_time = 0.0
+
+    @property
+    def violations(self):
+        return self.state.violations()
+
     def classify_direction(self, x_deg, y_deg):
-        YAW_THRESH = 15
-        PITCH_UP = 15
-        PITCH_DOWN = -15
-        
-        if y_deg < -YAW_THRESH:
-            return "Looking Left"
-        elif y_deg > YAW_THRESH:
-            return "Looking Right"
-        elif x_deg > PITCH_UP:
-            return "Looking Up"
-        elif x_deg < PITCH_DOWN:
-            return "Looking Down"
+        return self.policy.classify_direction(x_deg, y_deg)
+
+    def observe(self, signal, value, now):
+        if self.state.observe(signal, value, now):
+            self.last_violation_time = now
+
+    def is_urgent(self, now):
+        """Enrolling, face lost, a counted gaze dwell running or a recent violation"""
+        return (not self.enrolled
+                or self.state.value('face') != 'single'
+                or self.state.value('frame') == 'covered'
+                or self.current_gaze in self.policy.watched('gaze')
+                or now - self.last_violation_time < RECENT_VIOLATION_SECONDS)
+
+    def next_frame_interval(self, now):
+        """Sample faster while something is happening, slower once the candidate is settled"""
+        if self.is_urgent(now):
+            interval = FAST_INTERVAL
+        elif self.state.elapsed('gaze', now) >= STABLE_FORWARD_SECONDS:
+            interval = SLOW_INTERVAL
         else:
-            return "Forward"
+            interval = BASE_INTERVAL
+        # Stretched by measured worker load, and never shorter than the backlog
+        return max(interval * frame_scheduler.stretch, frame_scheduler.backlog_seconds())
+
+def overloaded_response():
+    retry_ms = int(frame_scheduler.retry_after() * 1000)
+    response = jsonify({
+        'success': False,
+        'overloaded': True,
+        'error': 'Server busy, retry later',
+        'retryAfterMs': retry_ms
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, round(retry_ms / 1000)))
+    return response
 
 @app.route('/api/proctor/start', methods=['POST'])
 def start_proctor():
     data = request.json
     session_id = data.get('sessionId', 'default')
     
-    proctor_sessions[session_id] = ProctorSession(session_id)
+    policy = None
+    if data.get('policy'):
+        try:
+            policy = compile_policy(merge_policy(SERVER_POLICY, data['policy']))
+        except (PolicyError, TypeError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Invalid policy: {e}'})
+    
+    proctor_sessions[session_id] = ProctorSession(session_id, policy)
     
     return jsonify({
         'success': True,
@@ -81,6 +144,10 @@ def analyze_frame():
         
         session = proctor_sessions[session_id]
         
+        frame_scheduler.note_arrival()
+        if not frame_scheduler.has_room(session_id):
+            return overloaded_response()
+        
         # Decode base64 image
         image_bytes = base64.b64decode(image_data.split(',')[1])
         nparr = np.frombuffer(image_bytes, np.uint8)
@@ -89,72 +156,134 @@ def analyze_frame():
         if frame is None:
             return jsonify({'success': False, 'error': 'Invalid image'})
         
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_frame)
+        now = time.time()
         
-        analysis_result = {
-            'enrolled': session.enrolled,
-            'faceDetected': False,
-            'gazeDirection': 'Forward',
-            'violations': session.violations,
-            'multiplePersons': False,
-            'status': 'No face detected'
-        }
+        # Dark, blown-out or blurred frames skip inference in the worker
+        quality = assess_frame(frame)
         
-        if results.multi_face_landmarks:
-            face_count = len(results.multi_face_landmarks)
-            
-            if face_count > 1:
-                analysis_result['multiplePersons'] = True
-                session.violations['multi_person'] += 1
-                analysis_result['status'] = 'Multiple people detected'
-            elif face_count == 1:
-                analysis_result['faceDetected'] = True
-                
-                if not session.enrolled:
-                    # Enrollment phase
-                    session.stable_frames += 1
-                    if session.stable_frames >= 10:
-                        session.enrolled = True
-                        analysis_result['enrolled'] = True
-                        analysis_result['status'] = 'Enrolled successfully'
-                    else:
-                        analysis_result['status'] = f'Enrolling... {session.stable_frames}/10'
-                else:
-                    # Monitoring phase
-                    landmarks = results.multi_face_landmarks[0]
-                    
-                    # Head pose estimation
-                    gaze_direction = estimate_gaze(landmarks, frame.shape)
-                    analysis_result['gazeDirection'] = gaze_direction
-                    
-                    # Check gaze violations
-                    now = time.time()
-                    if gaze_direction != session.current_gaze:
-                        session.current_gaze = gaze_direction
-                        session.gaze_start_time = now
-                    
-                    elapsed = now - session.gaze_start_time
-                    if gaze_direction in ['Looking Left', 'Looking Right', 'Looking Up'] and elapsed > 3:
-                        session.violations['gaze'] += 1
-                    
-                    analysis_result['status'] = 'Monitoring active'
-            else:
-                session.stable_frames = 0
-        else:
-            session.violations['face'] += 1
-            session.stable_frames = 0
+        job = frame_scheduler.submit(session, frame, now, quality, session.is_urgent(now))
+        if job is None:
+            return overloaded_response()
+        if not job.done.wait(ANALYZE_TIMEOUT):
+            # Only ask for a resend if the frame will never touch the session
+            if frame_scheduler.cancel(job):
+                return overloaded_response()
+            job.done.wait()
         
-        return jsonify({
-            'success': True,
-            'analysis': analysis_result
-        })
+        return jsonify(job.result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def estimate_gaze(landmarks, frame_shape):
+def frame_state(quality):
+    """Value fed to the policy's "frame" signal"""
+    if quality.covered:
+        return 'covered'
+    return 'good' if quality.ok else 'bad'
+
+def bad_frame_result(session, quality, now):
+    return {
+        'enrolled': session.enrolled,
+        'faceDetected': False,
+        'gazeDirection': session.current_gaze,
+        'violations': session.violations,
+        'multiplePersons': False,
+        'badFrame': quality.reason,
+        'cameraCovered': quality.covered,
+        'status': REASON_TEXT[quality.reason],
+        'nextIntervalMs': int(session.next_frame_interval(now) * 1000)
+    }
+
+def count_faces(session, rgb_frame, mesh_faces, now):
+    """Refresh the session's latched face count when due and return it"""
+    due = (now - session.face_count_time >= FACE_COUNT_INTERVAL
+           or mesh_faces == 0           # tracked face lost
+           or session.face_count > 1)   # clear a multi-person latch quickly
+    if due:
+        h, w = rgb_frame.shape[:2]
+        small = rgb_frame
+        if w > FACE_COUNT_WIDTH:
+            small = cv2.resize(rgb_frame, (FACE_COUNT_WIDTH, h * FACE_COUNT_WIDTH // w),
+                               interpolation=cv2.INTER_AREA)
+        detections = face_detection.process(small).detections
+        session.face_count = len(detections) if detections else 0
+        session.face_count_time = now
+    return max(session.face_count, mesh_faces)
+
+def process_frame(session, frame, now, quality):
+    """Run FaceMesh on a decoded frame and update the session; called by the scheduler worker"""
+    # Session state is only ever changed here, in frame order
+    session.observe('frame', frame_state(quality), now)
+    if not quality.ok:
+        return bad_frame_result(session, quality, now)
+    
+    # Convert BGR to RGB
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    results = face_mesh.process(rgb_frame)
+    
+    analysis_result = {
+        'enrolled': session.enrolled,
+        'faceDetected': False,
+        'gazeDirection': 'Forward',
+        'violations': session.violations,
+        'multiplePersons': False,
+        'status': 'No face detected'
+    }
+    
+    mesh_faces = len(results.multi_face_landmarks) if results.multi_face_landmarks else 0
+    face_count = count_faces(session, rgb_frame, mesh_faces, now)
+    analysis_result['faceCount'] = face_count
+    
+    if face_count > 1:
+        analysis_result['multiplePersons'] = True
+        session.observe('face', 'multiple', now)
+        analysis_result['status'] = 'Multiple people detected'
+        session.stable_frames = 0
+    elif mesh_faces:
+        analysis_result['faceDetected'] = True
+        session.observe('face', 'single', now)
+        
+        if not session.enrolled:
+            # Enrollment phase
+            session.stable_frames += 1
+            if session.stable_frames >= 10:
+                session.enrolled = True
+                analysis_result['enrolled'] = True
+                analysis_result['status'] = 'Enrolled successfully'
+            else:
+                analysis_result['status'] = f'Enrolling... {session.stable_frames}/10'
+        else:
+            # Monitoring phase
+            landmarks = results.multi_face_landmarks[0]
+            
+            # Head pose estimation
+            gaze_direction = estimate_gaze(landmarks, frame.shape, session)
+            analysis_result['gazeDirection'] = gaze_direction
+            
+            # Gaze dwell violations are counted by the session policy
+            session.current_gaze = gaze_direction
+            session.observe('gaze', gaze_direction, now)
+            
+            analysis_result['status'] = 'Monitoring active'
+    else:
+        session.observe('face', 'missing', now)
+        session.stable_frames = 0
+    
+    analysis_result['violations'] = session.violations
+    if session.state.breach:
+        analysis_result['policyBreach'] = session.state.breach[0]
+        analysis_result['status'] = session.state.breach[1]
+    analysis_result['nextIntervalMs'] = int(session.next_frame_interval(now) * 1000)
+    
+    return analysis_result
+
+def run_frame_job(job):
+    return {'success': True, 'analysis': process_frame(job.session, job.frame, job.now, job.quality)}
+
+frame_scheduler = FrameScheduler(MAX_QUEUED_FRAMES, run_frame_job,
+                                 priority_burst=PRIORITY_BURST, min_retry=FAST_INTERVAL)
+
+def estimate_gaze(landmarks, frame_shape, session):
     """Estimate gaze direction using facial landmarks"""
     try:
         h, w = frame_shape[:2]
@@ -224,7 +353,6 @@ def estimate_gaze(landmarks, frame_shape):
             z = angles[2] * 360
             
             # Classify direction
-            session = list(proctor_sessions.values())[0]  # Get current session
             return session.classify_direction(x, y)
         
     except Exception as e:
@@ -1,12 +1,14 @@
 import React, { useEffect, useState, useRef } from 'react'
 
+const STRIKE_COOLDOWN_MS = 1000
+
 const PythonProctor = ({ isActive, onViolation, totalViolations = 0 }) => {
   const [status, setStatus] = useState('Starting...')
   const [analysis, setAnalysis] = useState({
     enrolled: false,
     faceDetected: false,
     gazeDirection: 'Forward',
-    violations: { face: 0, gaze: 0, multi_person: 0, unknown_person: 0 },
+    violations: { face: 0, gaze: 0, multi_person: 0, unknown_person: 0, camera_blocked: 0 },
     multiplePersons: false,
     status: 'Initializing...'
   })
@@ -14,6 +16,10 @@ const PythonProctor = ({ isActive, onViolation, totalViolations = 0 }) => {
   const videoRef = useRef(null)
   const canvasRef = useRef(null)
   const intervalRef = useRef(null)
+  // Server recommends the delay before the next frame (nextIntervalMs)
+  const nextDelayRef = useRef(1000)
+  // Last strike time per violation type, so faster sampling doesn't mean faster strikes
+  const lastStrikeRef = useRef({})
 
   useEffect(() => {
     if (!isActive) {
@@ -58,45 +64,72 @@ const PythonProctor = ({ isActive, onViolation, totalViolations = 0 }) => {
   }
 
   const startFrameAnalysis = () => {
-    intervalRef.current = setInterval(async () => {
-      if (!videoRef.current || !canvasRef.current || totalViolations >= 3) return
-
-      try {
-        // Capture frame from video
-        const canvas = canvasRef.current
-        const ctx = canvas.getContext('2d')
-        canvas.width = videoRef.current.videoWidth
-        canvas.height = videoRef.current.videoHeight
-        
-        ctx.drawImage(videoRef.current, 0, 0)
-        
-        // Convert to base64
-        const imageData = canvas.toDataURL('image/jpeg', 0.8)
-        
-        // Send to Python server for analysis
-        const response = await fetch('http://localhost:5000/api/proctor/analyze', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            sessionId,
-            imageData
-          })
+    const tick = async () => {
+      await analyzeFrame()
+      // Stopped while the request was in flight
+      if (intervalRef.current === null) return
+      intervalRef.current = setTimeout(tick, nextDelayRef.current)
+    }
+    intervalRef.current = setTimeout(tick, nextDelayRef.current)
+  }
+
+  const analyzeFrame = async () => {
+    if (!videoRef.current || !canvasRef.current || totalViolations >= 3) return
+
+    try {
+      // Capture frame from video
+      const canvas = canvasRef.current
+      const ctx = canvas.getContext('2d')
+      canvas.width = videoRef.current.videoWidth
+      canvas.height = videoRef.current.videoHeight
+      
+      ctx.drawImage(videoRef.current, 0, 0)
+      
+      // Convert to base64
+      const imageData = canvas.toDataURL('image/jpeg', 0.8)
+      
+      // Send to Python server for analysis
+      const response = await fetch('http://localhost:5000/api/proctor/analyze', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          sessionId,
+          imageData
         })
+      })
 
-        if (response.ok) {
-          const result = await response.json()
-          if (result.success) {
-            setAnalysis(result.analysis)
-            setStatus(result.analysis.status)
-            
-            // Check for violations
-            checkViolations(result.analysis)
+      if (response.status === 503) {
+        // Server is shedding load; back off for as long as it asks
+        const result = await response.json()
+        if (result.retryAfterMs) {
+          nextDelayRef.current = result.retryAfterMs
+        }
+      } else if (response.ok) {
+        const result = await response.json()
+        if (result.success) {
+          if (result.analysis.nextIntervalMs) {
+            nextDelayRef.current = result.analysis.nextIntervalMs
           }
+          setAnalysis(result.analysis)
+          setStatus(result.analysis.status)
+          
+          // Check for violations
+          checkViolations(result.analysis)
         }
-      } catch (error) {
-        console.warn('Frame analysis error:', error)
       }
-    }, 1000) // Analyze every 1 second
+    } catch (error) {
+      console.warn('Frame analysis error:', error)
+    }
+  }
+
+  // At most one strike per type per STRIKE_COOLDOWN_MS (the old 1 fps cadence)
+  const strike = (type, message) => {
+    const now = Date.now()
+    if (now - (lastStrikeRef.current[type] || 0) < STRIKE_COOLDOWN_MS) {
+      return
+    }
+    lastStrikeRef.current[type] = now
+    setTimeout(() => onViolation?.(type, message), 0)
   }
 
   const checkViolations = (analysisData) => {
@@ -108,28 +141,33 @@ const PythonProctor = ({ isActive, onViolation, totalViolations = 0 }) => {
     
     // Face violations
     if (violations.face > 10) {
-      setTimeout(() => onViolation?.('NO_FACE', 'No face detected for too long'), 0)
+      strike('NO_FACE', 'No face detected for too long')
     }
     
     // Multiple persons
     if (multiplePersons) {
-      setTimeout(() => onViolation?.('MULTIPLE_FACES', 'Multiple people detected'), 0)
+      strike('MULTIPLE_FACES', 'Multiple people detected')
     }
     
     // Gaze violations
     if (violations.gaze > 15) {
-      setTimeout(() => onViolation?.('GAZE_AWAY', `Looking away: ${gazeDirection}`), 0)
+      strike('GAZE_AWAY', `Looking away: ${gazeDirection}`)
     }
     
     // Unknown person
     if (violations.unknown_person > 5) {
-      setTimeout(() => onViolation?.('UNKNOWN_PERSON', 'Unknown person detected'), 0)
+      strike('UNKNOWN_PERSON', 'Unknown person detected')
+    }
+    
+    // Lens covered (dark, flat frames only; dim or blurry frames are not counted)
+    if (violations.camera_blocked > 10) {
+      strike('CAMERA_BLOCKED', 'Camera covered')
     }
   }
 
   const stopProctoring = async () => {
     if (intervalRef.current) {
-      clearInterval(intervalRef.current)
+      clearTimeout(intervalRef.current)
       intervalRef.current = null
     }
 
@@ -190,7 +228,8 @@ const PythonProctor = ({ isActive, onViolation, totalViolations = 0 }) => {
         • Face: {analysis.violations.face}/10<br/>
         • Gaze: {analysis.violations.gaze}/15<br/>
         • Multi: {analysis.violations.multi_person}<br/>
-        • Unknown: {analysis.violations.unknown_person}/5
+        • Unknown: {analysis.violations.unknown_person}/5<br/>
+        • Camera blocked: {analysis.violations.camera_blocked ?? 0}/10
       </div>
       
       <canvas ref={canvasRef} style={{ display: 'none' }} />
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_quality import assess_frame
+
+
+def head_on_plain_wall(seed=0):
+    """640x480 webcam-like frame: flat wall, head and shoulders, mild sensor noise"""
+    rng = np.random.default_rng(seed)
+    img = np.full((480, 640, 3), 150, np.uint8)
+    cv2.ellipse(img, (320, 480), (200, 90), 0, 180, 360, (60, 60, 90), -1)
+    cv2.ellipse(img, (320, 220), (85, 110), 0, 0, 360, (170, 150, 130), -1)
+    cv2.ellipse(img, (320, 140), (90, 60), 0, 180, 360, (40, 35, 30), -1)
+    for x in (285, 355):
+        cv2.ellipse(img, (x, 205), (16, 8), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(img, (x, 205), 6, (40, 30, 20), -1)
+    cv2.line(img, (320, 215), (315, 255), (120, 100, 90), 2)
+    cv2.ellipse(img, (320, 280), (28, 10), 0, 0, 180, (90, 60, 70), 3)
+    return np.clip(img + rng.normal(0, 3, img.shape), 0, 255).astype(np.uint8)
+
+
+def scale(img, factor, offset=0):
+    return np.clip(img.astype(np.float32) * factor + offset, 0, 255).astype(np.uint8)
+
+
+def motion_blur(img, length):
+    kernel = np.zeros((length, length), np.float32)
+    kernel[length // 2, :] = 1.0 / length
+    return cv2.filter2D(img, -1, kernel)
+
+
+FRAME = head_on_plain_wall()
+
+
+@pytest.mark.parametrize("name, frame", [
+    ("sharp", FRAME),
+    ("gaussian sigma 2", cv2.GaussianBlur(FRAME, (0, 0), 2)),
+    ("gaussian sigma 4", cv2.GaussianBlur(FRAME, (0, 0), 4)),
+    ("motion blur 31 px", motion_blur(FRAME, 31)),
+    ("dim room", scale(FRAME, 0.25)),
+    ("dim and soft", scale(cv2.GaussianBlur(FRAME, (0, 0), 2), 0.25)),
+    ("backlit", scale(FRAME, 0.6, 90)),
+])
+def test_usable_frames_pass(name, frame):
+    quality = assess_frame(frame)
+    assert quality.ok, (name, quality)
+    assert not quality.covered
+
+
+@pytest.mark.parametrize("name, frame, reason", [
+    ("gaussian sigma 6", cv2.GaussianBlur(FRAME, (0, 0), 6), "blurry"),
+    ("nearly dark", scale(FRAME, 0.15), "too_dark"),
+    ("blown out", scale(FRAME, 1.0, 200), "overexposed"),
+    ("flat grey", np.full((480, 640, 3), 128, np.uint8), "low_contrast"),
+])
+def test_unusable_frames_are_rejected(name, frame, reason):
+    quality = assess_frame(frame)
+    assert not quality.ok
+    assert quality.reason == reason, (name, quality)
+    assert not quality.covered
+
+
+@pytest.mark.parametrize("frame", [
+    np.zeros((480, 640, 3), np.uint8),
+    np.clip(np.random.default_rng(1).normal(12, 2, (480, 640, 3)), 0, 255).astype(np.uint8),
+])
+def test_covered_lens_is_flagged(frame):
+    quality = assess_frame(frame)
+    assert not quality.ok and quality.covered
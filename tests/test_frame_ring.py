@@ -0,0 +1,82 @@
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRing
+
+SHAPE = (48, 64, 3)
+
+
+def _writer(name, count, ready):
+    ring = FrameRing.attach(name)
+    ready.wait()
+    for i in range(count):
+        slot = ring.begin_write()
+        slot[...] = i % 256
+        ring.commit()
+    ring.close()
+
+
+def test_frames_written_in_one_process_are_read_in_another():
+    ring = FrameRing.create(SHAPE, slots=64)
+    reader = ring.reader(0)
+    ready = mp.Event()
+    proc = mp.Process(target=_writer, args=(ring.name, 40, ready))
+    proc.start()
+    ready.set()
+    proc.join(10)
+    assert proc.exitcode == 0
+
+    seen = []
+    while True:
+        seq, frame = reader.next()
+        if frame is None:
+            break
+        assert (frame == seq % 256).all()
+        seen.append(seq)
+    assert seen == list(range(40))
+    assert ring.lag(0) == 0
+    ring.close()
+
+
+def test_lapped_reader_skips_to_oldest_intact_frame():
+    ring = FrameRing.create(SHAPE, slots=4)
+    reader = ring.reader(0)
+    for i in range(10):
+        ring.write(np.full(SHAPE, i, np.uint8))
+    seq, frame = reader.next()
+    assert seq == 7 and frame[0, 0, 0] == 7
+    assert reader.still_valid(seq)
+    ring.write(np.full(SHAPE, 10, np.uint8))
+    ring.write(np.full(SHAPE, 11, np.uint8))
+    ring.write(np.full(SHAPE, 12, np.uint8))
+    ring.write(np.full(SHAPE, 13, np.uint8))
+    assert not reader.still_valid(seq)
+    assert reader.latest()[0] == 13
+    assert reader.next() == (None, None)
+    ring.close()
+
+
+def test_overwritten_slot_moves_on_to_next_frame():
+    ring = FrameRing.create(SHAPE, slots=4)
+    reader = ring.reader(0)
+    for i in range(3):
+        ring.write(np.full(SHAPE, i, np.uint8))
+    # Writer is mid-way through reusing the slot of frame 0
+    ring._slot_seq[0] = -1
+    seq, frame = reader.next()
+    assert seq == 1 and frame[0, 0, 0] == 1
+    ring.close()
+
+
+def test_attach_reads_and_checks_shape_and_dtype():
+    ring = FrameRing.create(SHAPE, dtype=np.uint8)
+    other = FrameRing.attach(ring.name)
+    assert other.shape == SHAPE and other.dtype == np.uint8
+    other.close()
+    with pytest.raises(ValueError):
+        FrameRing.attach(ring.name, shape=(480, 640, 3))
+    with pytest.raises(ValueError):
+        FrameRing.attach(ring.name, dtype=np.float32)
+    ring.close()
@@ -0,0 +1,146 @@
+import threading
+
+from frame_scheduler import FrameScheduler
+
+
+class Session:
+    def __init__(self, session_id):
+        self.session_id = session_id
+
+
+def make(capacity=8, burst=3):
+    processed = []
+
+    def process(job):
+        processed.append((job.session.session_id, job.frame))
+        return {'success': True, 'frame': job.frame}
+
+    return FrameScheduler(capacity, process, priority_burst=burst, start=False), processed
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        job = scheduler._next_job()
+        if job is None:
+            return order
+        order.append((job.session.session_id, job.frame))
+
+
+def test_newer_frame_supersedes_queued_one_and_keeps_its_place():
+    scheduler, _ = make()
+    a, b = Session('a'), Session('b')
+    old = scheduler.submit(a, 1, 0, None, False)
+    scheduler.submit(b, 2, 0, None, False)
+    new = scheduler.submit(a, 3, 0, None, False)
+    assert old.done.is_set() and old.result == {'success': False, 'superseded': True}
+    assert not new.done.is_set()
+    assert drain(scheduler) == [('a', 3), ('b', 2)]
+
+
+def test_lane_switches_leave_one_place_in_line():
+    scheduler, _ = make()
+    a, b = Session('a'), Session('b')
+    scheduler.submit(a, 1, 0, None, False)
+    scheduler.submit(a, 2, 0, None, True)
+    scheduler.submit(b, 3, 0, None, False)
+    scheduler.submit(a, 4, 0, None, False)
+    assert list(scheduler.lanes['normal']) == [scheduler.pending['b'], scheduler.pending['a']]
+    assert not scheduler.lanes['priority']
+    # a re-queued behind b, so it does not jump ahead on a stale position
+    assert drain(scheduler) == [('b', 3), ('a', 4)]
+
+
+def test_priority_lane_first_with_burst_limit():
+    scheduler, _ = make(burst=2)
+    for i in range(3):
+        scheduler.submit(Session(f'n{i}'), i, 0, None, False)
+    for i in range(4):
+        scheduler.submit(Session(f'p{i}'), i, 0, None, True)
+    order = [sid for sid, _ in drain(scheduler)]
+    assert order == ['p0', 'p1', 'n0', 'p2', 'p3', 'n1', 'n2']
+
+
+def test_full_queue_refuses_new_sessions_but_not_queued_ones():
+    scheduler, _ = make(capacity=2)
+    scheduler.submit(Session('a'), 1, 0, None, False)
+    scheduler.submit(Session('b'), 2, 0, None, False)
+    assert not scheduler.has_room('c')
+    assert scheduler.submit(Session('c'), 3, 0, None, False) is None
+    assert scheduler.has_room('a')
+    assert scheduler.submit(Session('a'), 4, 0, None, False) is not None
+
+
+def test_cancelled_job_is_never_processed():
+    scheduler, _ = make()
+    a = Session('a')
+    job = scheduler.submit(a, 1, 0, None, False)
+    assert scheduler.cancel(job)
+    assert not scheduler.lanes['normal']
+    assert drain(scheduler) == []
+    scheduler.submit(a, 2, 0, None, False)
+    assert drain(scheduler) == [('a', 2)]
+
+
+def test_cancel_loses_race_with_worker():
+    started, release = threading.Event(), threading.Event()
+
+    def process(job):
+        started.set()
+        release.wait(5)
+        return {'success': True}
+
+    scheduler = FrameScheduler(4, process)
+    job = scheduler.submit(Session('a'), 1, 0, None, False)
+    assert started.wait(5)
+    # The worker already took it, so the request must wait for its result
+    assert not scheduler.cancel(job)
+    release.set()
+    assert job.done.wait(5) and job.result == {'success': True}
+
+
+def test_worker_errors_are_reported_to_the_request():
+    def process(job):
+        raise RuntimeError('boom')
+
+    scheduler = FrameScheduler(4, process)
+    job = scheduler.submit(Session('a'), 1, 0, None, False)
+    assert job.done.wait(5)
+    assert job.result == {'success': False, 'error': 'boom'}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def feed(scheduler, clock, fps, seconds):
+    for _ in range(int(fps * seconds)):
+        scheduler.note_arrival()
+        clock.now += 1.0 / fps
+
+
+def test_stretch_follows_measured_load():
+    clock = Clock()
+    scheduler = FrameScheduler(8, lambda job: {}, clock=clock, start=False)
+    scheduler.service_time = 0.1
+    # 20 fps at 0.1 s each is twice the worker's capacity
+    feed(scheduler, clock, 20, 1.1)
+    assert abs(scheduler.stretch - 2.0 / 0.8) < 1e-9
+    # Clients slowed down to the target load: stretch holds steady
+    feed(scheduler, clock, 8, 4)
+    assert 2.0 < scheduler.stretch < 3.2
+    # Load gone: back to normal intervals
+    feed(scheduler, clock, 1, 3)
+    assert scheduler.stretch == 1.0
+
+
+def test_stretch_is_capped():
+    clock = Clock()
+    scheduler = FrameScheduler(8, lambda job: {}, max_stretch=4.0, clock=clock, start=False)
+    scheduler.service_time = 1.0
+    feed(scheduler, clock, 50, 1.1)
+    assert scheduler.stretch == 4.0
@@ -0,0 +1,164 @@
+import pytest
+
+from proctor_policy import (
+    GAZE_AWAY, SERVER_POLICY, STANDALONE_POLICY, PolicyError, compile_policy, merge_policy,
+)
+
+
+def test_episode_rule_counts_once_per_hold():
+    state = compile_policy(STANDALONE_POLICY).new_state(0)
+    assert state.observe("face", "violation", 0)
+    assert not state.observe("face", "violation", 1)
+    state.observe("face", "ok", 2)
+    assert state.observe("face", "violation", 3)
+    assert state.count("face") == 2
+
+
+def test_dwell_and_limit_breach():
+    state = compile_policy(STANDALONE_POLICY).new_state(0)
+    for i in range(6):
+        state.observe("gaze", "Looking Left", i * 10)
+        state.observe("gaze", None, i * 10 + 5)
+        state.observe("gaze", "Forward", i * 10 + 6)
+    assert state.count("Looking Left") == 6
+    assert state.breach[0] == "gaze_away"
+
+
+def test_total_limit_spans_counters():
+    policy = compile_policy(STANDALONE_POLICY)
+    assert policy.limit_for(*GAZE_AWAY) == 8
+    assert policy.limit_for("Looking Left") == 5
+
+
+def test_override_without_rules_for_fed_signals():
+    config = merge_policy(SERVER_POLICY, {"rules": [
+        {"counter": "face", "signal": "face", "when": ["missing"]},
+    ]})
+    state = compile_policy(config).new_state(0)
+    assert not state.observe("gaze", "Looking Left", 1)
+    assert not state.observe("frame", "bad", 1)
+    assert state.elapsed("gaze", 3) == 2
+    assert state.value("gaze", "Forward") == "Looking Left"
+    assert state.observe("face", "missing", 2)
+
+
+def test_unknown_signal_and_counter_are_defaults():
+    policy = compile_policy(merge_policy(STANDALONE_POLICY, {"counters": [], "rules": [], "limits": []}))
+    state = policy.new_state(0)
+    assert not state.observe("something_else", "x", 1)
+    assert state.value("something_else", "dflt") == "dflt"
+    assert state.elapsed("something_else", 1) == 0.0
+    assert state.count("iris") == 0
+    assert policy.limit_for("iris") is None
+    assert policy.limit_for("face") is None
+
+
+def test_numeric_strings_are_converted():
+    config = merge_policy(STANDALONE_POLICY, {"limits": [
+        {"reason": "face_proctoring", "counters": ["face"], "max": "1"},
+    ]})
+    state = compile_policy(config).new_state(0)
+    state.observe("face", "violation", 0)
+    state.observe("face", "ok", 1)
+    assert state.breach is None
+    state.observe("face", "violation", 2)
+    assert state.breach[0] == "face_proctoring"
+
+
+@pytest.mark.parametrize("override", [
+    {"limits": [{"reason": "r", "counters": ["face"], "max": "three"}]},
+    {"limits": [{"reason": "r", "counters": ["face"], "max": None}]},
+    {"limits": [{"reason": "r", "counters": "face", "max": 1}]},
+    {"limits": [{"reason": "r", "counters": ["nope"], "max": 1}]},
+    {"rules": [{"counter": "face", "signal": "face", "when": ["x"], "dwell": "soon"}]},
+    {"rules": [{"counter": "face", "signal": "face", "when": "missing"}]},
+    {"rules": [{"counter": "face", "signal": "face", "when": ["x"], "count": "sometimes"}]},
+    {"rules": [{"counter": "face", "when": ["x"]}]},
+])
+def test_bad_policies_are_rejected_at_compile_time(override):
+    with pytest.raises(PolicyError):
+        compile_policy(merge_policy(SERVER_POLICY, override))
+
+
+@pytest.mark.parametrize("interval", [0.5, 1.0, 2.5])
+def test_seconds_count_does_not_depend_on_sampling_interval(interval):
+    state = compile_policy(SERVER_POLICY).new_state(0)
+    t = 0.0
+    state.observe("face", "single", t)
+    while t < 20:
+        t += interval
+        state.observe("face", "missing", t)
+    # Missing from the first missing frame to t=20
+    assert state.count("face") == pytest.approx(20 - interval)
+
+
+def test_seconds_count_starts_after_dwell_and_caps_gaps():
+    state = compile_policy(SERVER_POLICY).new_state(0)
+    state.observe("gaze", "Looking Left", 0)
+    state.observe("gaze", "Looking Left", 2)
+    assert state.count("gaze") == 0
+    state.observe("gaze", "Looking Left", 4)
+    assert state.count("gaze") == pytest.approx(1)
+    state.observe("gaze", "Looking Left", 60)
+    assert state.count("gaze") == pytest.approx(6)
+    assert state.violations()["gaze"] == 6
+
+
+def test_watched_values_exclude_looking_down():
+    policy = compile_policy(SERVER_POLICY)
+    assert "Looking Down" not in policy.watched("gaze")
+    assert set(GAZE_AWAY) == policy.watched("gaze")
+    assert policy.watched("phone") == frozenset()
+
+
+def test_bad_frames_never_count_as_face_time_on_server():
+    state = compile_policy(SERVER_POLICY).new_state(0)
+    for t in range(0, 30):
+        state.observe("frame", "bad", t)
+    assert state.count("face") == 0
+    assert state.count("camera_blocked") == 0
+    assert state.count("bad_frame") == pytest.approx(29)
+
+
+def test_covered_lens_counts_camera_blocked_seconds_on_server():
+    state = compile_policy(SERVER_POLICY).new_state(0)
+    state.observe("frame", "good", 0)
+    for t in range(1, 20):
+        state.observe("frame", "covered", t)
+    # Covered from t=1, counted past the 3 s dwell
+    assert state.count("camera_blocked") == pytest.approx(19 - 1 - 3)
+    assert state.count("face") == 0
+
+
+@pytest.mark.parametrize("interval", [0.5, 1.0])
+def test_bad_frame_seconds_do_not_depend_on_sampling(interval):
+    state = compile_policy(SERVER_POLICY).new_state(0)
+    t = 0.0
+    while t < 10:
+        state.observe("frame", "bad", t)
+        t += interval
+    assert state.count("bad_frame") == pytest.approx(10 - interval)
+
+
+def test_unusable_stretches_do_not_end_standalone_exam():
+    state = compile_policy(STANDALONE_POLICY).new_state(0)
+    t = 0
+    for _ in range(5):
+        state.observe("frame", "bad", t)
+        state.observe("frame", "bad", t + 11)
+        state.observe("frame", "good", t + 12)
+        t += 20
+    assert state.count("bad_frame") == 5
+    assert state.breach is None
+
+
+def test_covered_camera_ends_standalone_exam():
+    state = compile_policy(STANDALONE_POLICY).new_state(0)
+    t = 0
+    for _ in range(3):
+        state.observe("frame", "covered", t)
+        state.observe("frame", "covered", t + 11)
+        state.observe("frame", "good", t + 12)
+        t += 20
+    assert state.count("camera_blocked") == 3
+    assert state.breach[0] == "camera_blocked"